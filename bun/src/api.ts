@@ -37,8 +37,12 @@ export class ApiClient {
     return { "content-type": "application/json", "x-api-key": this.apiKey };
   }
 
+  private url(endpoint: string) {
+    return `${this.apiUrl.replace(/\/+$/, "")}${endpoint.replace(/^\/api\/v1/, restBasePath(this.apiKey))}`;
+  }
+
   private async request(method: string, endpoint: string, body?: any) {
-    const url = `${this.apiUrl}${endpoint.replace(/^\/api\/v1/, restBasePath(this.apiKey))}`;
+    const url = this.url(endpoint);
     const opts: RequestInit = { method, headers: this.headers, signal: AbortSignal.timeout(30_000) };
     if (body) opts.body = JSON.stringify(body);
     const res = await fetch(url, opts);
@@ -200,6 +204,25 @@ export class ApiClient {
     return this.request("POST", `/api/v1/projects/${projectId}/recommendations`, body);
   }
 
+  // ── Attachments ──
+
+  /** GET the raw attachment; the caller decides how to consume the body. */
+  async downloadFile(attachmentId: string): Promise<Response> {
+    const res = await fetch(this.url(`/api/v1/files/${attachmentId}`), { headers: { "x-api-key": this.apiKey } });
+    if (!res.ok) throw new Error(`Backend responded with ${res.status}`);
+    return res;
+  }
+
+  async registerResource(form: FormData): Promise<Record<string, any>> {
+    const res = await fetch(this.url("/api/v1/resources/register"), {
+      method: "POST",
+      headers: { "x-api-key": this.apiKey },
+      body: form,
+    });
+    if (!res.ok) throw new Error(`Backend responded with ${res.status}: ${await res.text()}`);
+    return res.json().catch(() => ({}));
+  }
+
   /** Fetch a single spec from the public registry (no auth required). */
   async getRegistrySpec(specId: string): Promise<RegistrySpec> {
     const base = this.apiUrl.replace(/\/api\/v1\/?$/, "").replace(/\/$/, "");
@@ -0,0 +1,93 @@
+import { describe, test, expect } from "bun:test";
+import { TODOforAIEdge } from "./edge.js";
+
+function makeEdge(connected = true) {
+  const edge = new TODOforAIEdge({ apiUrl: "http://localhost:1", apiKey: "k", debug: false, kill: false, noAutoUpdate: true });
+  edge.edgeId = "edge-1";
+  edge.connected = connected;
+  const calls: Record<string, any>[] = [];
+  edge.api.patchEdgeConfig = (async (_id: string, updates: Record<string, any>) => { calls.push({ ...updates }); }) as any;
+  return { edge, calls };
+}
+
+const tick = (ms: number) => new Promise(r => setTimeout(r, ms));
+
+describe("config sync", () => {
+  test("a burst of updates goes out as one PATCH", async () => {
+    const { edge, calls } = makeEdge();
+    await Promise.all([
+      edge.updateConfig({ name: "box" }),
+      edge.updateConfig({ workspacepaths: ["/tmp/a"] }),
+    ]);
+    expect(calls).toEqual([{ name: "box", workspacepaths: ["/tmp/a"] }]);
+  });
+
+  test("resolves only after the batch has been sent", async () => {
+    const { edge, calls } = makeEdge();
+    let done = false;
+    const p = edge.updateConfig({ name: "box" }).then(() => { done = true; });
+    await tick(50);
+    expect(done).toBe(false);
+    expect(calls).toHaveLength(0);
+    await p;
+    expect(calls).toHaveLength(1);
+  });
+
+  test("changes queued while disconnected are sent after CONNECTED_EDGE", async () => {
+    const { edge, calls } = makeEdge(false);
+    let done = false;
+    const p = edge.updateConfig({ name: "box" }).then(() => { done = true; });
+    await tick(300);
+    expect(calls).toHaveLength(0);
+    expect(done).toBe(false);
+
+    edge.connected = true;
+    (edge as any).scheduleConfigSync();
+    await p;
+    expect(calls).toEqual([{ name: "box" }]);
+  });
+
+  test("a drop inside the debounce window keeps the batch", async () => {
+    const { edge, calls } = makeEdge();
+    const p = edge.updateConfig({ name: "box" });
+    edge.connected = false;
+    await tick(300);
+    expect(calls).toHaveLength(0);
+
+    edge.connected = true;
+    (edge as any).scheduleConfigSync();
+    await p;
+    expect(calls).toEqual([{ name: "box" }]);
+  });
+
+  test("an update the server already accepted is not re-sent", async () => {
+    const { edge, calls } = makeEdge();
+    await edge.updateConfig({ installedTools: { gh: { installed: true } } });
+    await edge.updateConfig({ installedTools: { gh: { installed: true } } });
+    expect(calls).toHaveLength(1);
+  });
+
+  test("a failed PATCH is retried by the next identical update", async () => {
+    const { edge, calls } = makeEdge();
+    const ok = edge.api.patchEdgeConfig;
+    edge.api.patchEdgeConfig = (async () => { throw new Error("503"); }) as any;
+    await edge.updateConfig({ name: "box" });
+    edge.api.patchEdgeConfig = ok;
+    await edge.updateConfig({ name: "box" });
+    expect(calls).toEqual([{ name: "box" }]);
+  });
+
+  test("stop() settles updates still waiting for a connection", async () => {
+    const { edge, calls } = makeEdge(false);
+    let done = false;
+    const p = edge.updateConfig({ name: "box" }).then(() => { done = true; });
+    await tick(50);
+    expect(done).toBe(false);
+
+    edge.stop();
+    await p;
+    expect(calls).toHaveLength(0);
+    // Once stopped, later updates don't wait either.
+    await edge.updateConfig({ name: "other" });
+  });
+});
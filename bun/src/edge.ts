@@ -1,4 +1,6 @@
 import WebSocket from "ws";
+import https from "https";
+import { isDeepStrictEqual } from "util";
 import { getWsUrl, normalizeApiUrl, loadSavedApiKey, saveApiKey, clearApiKey, type Config } from "./config.js";
 import { setConnectionContext } from "./connection-context.js";
 import { SR, FE, AE, EF, S2E, msg, type WsMessage } from "./constants.js";
@@ -24,10 +26,19 @@ import {
 import { scanCatalogTools, autoMountRcloneRemotes } from "./tool-registry.js";
 import { handlePreviewHttpRequest } from "./preview.js";
 import type { SendFn } from "./shell.js";
+import { FORBIDDEN_PATHS } from "./path-utils.js";
 
 // ── Fingerprint ──
 
+// Memoized per process, not on disk: a copied home directory (migration,
+// backups, dotfile sync) would otherwise hand another machine our identity.
+let cachedFingerprint: string | undefined;
+
 function generateFingerprint(): string {
+  return cachedFingerprint ??= computeFingerprint();
+}
+
+function computeFingerprint(): string {
   const os = require("os");
   const fs = require("fs");
   const identifiers: Record<string, string> = {};
@@ -57,9 +68,54 @@ function generateFingerprint(): string {
   return Buffer.from(json).toString("base64");
 }
 
-// ── Forbidden workspace paths ──
+type MessageHandler = (payload: Record<string, any>) => Promise<void>;
 
-const FORBIDDEN_PATHS = new Set(["/", "/tmp", "C:\\", "C:/"]);
+/** Run at most `max` wrapped tasks at once; the rest wait FIFO. A finishing
+ *  task hands its slot straight to the next waiter so a newcomer can't jump in. */
+function createLimiter(max: number) {
+  let active = 0;
+  const queue: (() => void)[] = [];
+  return async <T>(fn: () => Promise<T>): Promise<T> => {
+    if (active < max) active++;
+    else await new Promise<void>(r => queue.push(r));
+    try {
+      return await fn();
+    } finally {
+      const next = queue.shift();
+      if (next) next();
+      else active--;
+    }
+  };
+}
+
+// File transfers hold whole files (up to 20MB, base64-inflated) in memory, so a
+// burst of chunk requests is bounded. Shell/function-call handlers are not:
+// they can legitimately run for minutes, and BLOCK_SIGNAL/BLOCK_KEYBOARD must
+// never queue behind the very process they're meant to interrupt.
+const MAX_CONCURRENT_FILE_IO = 8;
+
+// ── Reconnect backoff ──
+
+/** Seconds to wait before reconnect `attempt` (1-based): 2,4,8,16,30,30…
+ *  plus up to 25% jitter, so edges dropped by the same outage don't all come
+ *  back in lockstep.
+ *
+ *  1012 (Service Restart) is a planned zero-downtime deploy signal, not a
+ *  failure: nginx has already switched to the new instance, so the retry after
+ *  the first 1012 in a row is near-instant (shrinks the offline gap that
+ *  otherwise drops the device from the agent's tool list mid-turn). Only the
+ *  first — a server that keeps answering 1012 must not turn the loop into a
+ *  5/s reconnect storm. */
+function reconnectDelay(attempt: number, consecutive1012: number): number {
+  const base = consecutive1012 === 1 ? 0.2 : Math.min(2 * 2 ** Math.min(attempt - 1, 4), 30);
+  return base * (1 + Math.random() * 0.25);
+}
+
+/** Server ERROR messages that mean the key itself was rejected (no reconnect). */
+const AUTH_ERROR_RE = /API key|authentication/i;
+
+/** Coalescing window for config PATCHes to the backend. */
+const CONFIG_SYNC_DEBOUNCE_MS = 200;
 
 // ── Main class ──
 
@@ -75,6 +131,8 @@ export class TODOforAIEdge {
   maxTimeout: number;
   private wsUrl: string;
   private fingerprint = "";
+  /** wsUrl + fingerprint query, fixed for the life of start(). */
+  private connectUrl = "";
   private heartbeatTimer?: ReturnType<typeof setInterval>;
   private addWorkspacePath?: string;
   private frontendWs: FrontendWebSocket | null = null;
@@ -83,6 +141,10 @@ export class TODOforAIEdge {
   private reconnectTimer?: ReturnType<typeof setTimeout>;
   private wakeReconnect?: () => void;
   private connectedAt = 0;
+  private readonly handlers: Map<string, MessageHandler>;
+  /** Shared across reconnects: its TLS session cache lets a reconnect resume
+   *  the previous session instead of paying for a full handshake. */
+  private readonly wsAgent?: https.Agent;
 
   edgeConfig: EdgeConfigData = {
     id: "",
@@ -92,22 +154,29 @@ export class TODOforAIEdge {
     status: "OFFLINE",
   };
 
-  private configSyncableFields = ["workspacepaths", "name", "installedTools"];
+  private readonly configSyncableFields: ReadonlySet<string> = new Set(["workspacepaths", "name", "installedTools"]);
+  private pendingConfigSync: Record<string, any> = {};
+  /** Last syncable values the server is known to hold (accepted PATCH or
+   *  EDGE_CONFIG_UPDATE). Diffed against, never the local edgeConfig, so a
+   *  failed or dropped sync is retried by the next identical update. Reset per
+   *  connection. */
+  private serverConfig: Record<string, any> = {};
+  private configSyncWaiters: (() => void)[] = [];
+  private configSyncTimer?: ReturnType<typeof setTimeout>;
+  private configSyncClosed = false;
 
   constructor(config: Config) {
     this.api = new ApiClient(normalizeApiUrl(config.apiUrl), config.apiKey);
     this.debug = config.debug;
     this.maxTimeout = config.maxTimeout ?? 0;
     this.wsUrl = getWsUrl(this.api.apiUrl);
+    if (this.wsUrl.startsWith("wss://")) this.wsAgent = new https.Agent({ rejectUnauthorized: false });
     this.addWorkspacePath = config.addWorkspacePath;
     this.browserExtensionBridge = new BrowserExtensionBridge(this.debug);
     setConnectionContext(() => ({ apiUrl: this.api.apiUrl, sessionToken: this.sessionToken }));
+    this.handlers = this.buildHandlers();
   }
 
-  // Convenience accessors for functions that need client context
-  get apiUrl() { return this.api.apiUrl; }
-  get apiKey() { return this.api.apiKey; }
-
   // ── Send ──
 
   sendResponse: SendFn = async (message: WsMessage) => {
@@ -240,29 +309,80 @@ export class TODOforAIEdge {
 
   // ── Config sync ──
 
+  /** Apply local changes and sync the ones the server doesn't already have — a
+   *  rescan on every connect usually finds the same installedTools. */
   public async updateConfig(updates: Partial<EdgeConfigData>) {
     Object.assign(this.edgeConfig, updates);
     await this.syncConfigToServer(updates);
   }
 
-  private async syncConfigToServer(changes: Partial<EdgeConfigData>) {
-    if (!this.edgeId || !this.connected) return;
-    const syncable: Record<string, any> = {};
+  /** Merge syncable fields into the pending PATCH; a burst of changes (cd into
+   *  several dirs, install + rescan) goes out as one request after a short
+   *  debounce. Resolves once the batch containing these changes has been sent —
+   *  while offline that means after the next CONNECTED_EDGE — or, if the edge
+   *  shuts down first, at shutdown (the batch itself stays queued). */
+  private syncConfigToServer(changes: Partial<EdgeConfigData>): Promise<void> {
+    let queued = false;
     for (const [k, v] of Object.entries(changes)) {
-      if (this.configSyncableFields.includes(k)) syncable[k] = v;
+      if (!this.configSyncableFields.has(k)) continue;
+      // A field already queued is re-queued even if it now matches the server,
+      // so the stale queued value doesn't go out instead.
+      if (k in this.pendingConfigSync || !isDeepStrictEqual(this.serverConfig[k], v)) {
+        this.pendingConfigSync[k] = v;
+        queued = true;
+      }
     }
-    if (Object.keys(syncable).length === 0) return;
+    if (!queued || this.configSyncClosed) return Promise.resolve();
+    return new Promise(resolve => {
+      this.configSyncWaiters.push(resolve);
+      this.scheduleConfigSync();
+    });
+  }
+
+  private scheduleConfigSync() {
+    if (this.configSyncTimer || !Object.keys(this.pendingConfigSync).length) return;
+    if (!this.edgeId || !this.connected) return;
+    this.configSyncTimer = setTimeout(() => this.flushConfigSync(), CONFIG_SYNC_DEBOUNCE_MS);
+  }
+
+  private async flushConfigSync() {
+    this.configSyncTimer = undefined;
+    // Dropped mid-debounce: keep the batch (and its waiters) for CONNECTED_EDGE.
+    if (!this.edgeId || !this.connected) return;
+    const updates = this.pendingConfigSync;
+    const waiters = this.configSyncWaiters;
+    this.pendingConfigSync = {};
+    this.configSyncWaiters = [];
+    // Snapshot what is sent: workspacepaths is mutated in place afterwards.
+    const sent = structuredClone(updates);
     try {
-      await this.api.patchEdgeConfig(this.edgeId, syncable);
+      await this.api.patchEdgeConfig(this.edgeId, updates);
+      Object.assign(this.serverConfig, sent);
     } catch (e: any) {
       console.error(`[error] Failed to sync config: ${e.message}`);
     }
+    for (const w of waiters) w();
+  }
+
+  /** No more connections are coming (stop, or start() gave up): settle every
+   *  pending updateConfig now rather than leaving it hanging on a reconnect. */
+  private closeConfigSync() {
+    this.configSyncClosed = true;
+    clearTimeout(this.configSyncTimer);
+    this.configSyncTimer = undefined;
+    const waiters = this.configSyncWaiters;
+    this.configSyncWaiters = [];
+    for (const w of waiters) w();
   }
 
   private handleEdgeConfigUpdate(payload: Record<string, any>) {
     const edgeId = payload.edgeId;
     if (edgeId && edgeId !== this.edgeId) return;
 
+    for (const k of this.configSyncableFields) {
+      if (k in payload) this.serverConfig[k] = structuredClone(payload[k]);
+    }
+
     // Filter forbidden workspace paths
     if (payload.workspacepaths) {
       const path = require("path");
@@ -289,11 +409,12 @@ export class TODOforAIEdge {
   // ── Pending binary frames (binaryId → Uint8Array) ──
   private pendingBinaries = new Map<string, Uint8Array>();
 
-  private storeBinaryFrame(frame: Uint8Array) {
+  /** Frame layout: 36-byte ASCII binaryId, then the raw file bytes. The body is
+   *  kept as a view into the received buffer — no copy of a multi-MB upload. */
+  private storeBinaryFrame(frame: Buffer) {
     if (frame.length < 36) return;
-    let id = '';
-    for (let i = 0; i < 36; i++) id += String.fromCharCode(frame[i]);
-    const data = frame.slice(36);
+    const id = frame.toString("latin1", 0, 36);
+    const data = frame.subarray(36);
     this.pendingBinaries.set(id, data);
     // Auto-expire after 60s
     setTimeout(() => this.pendingBinaries.delete(id), 60_000).unref();
@@ -312,7 +433,7 @@ export class TODOforAIEdge {
     if (msgType === "ERROR") {
       const errMsg = payload.message || "Unknown error";
       console.error(`\x1b[31mServer error: ${errMsg}\x1b[0m`);
-      if (errMsg.includes("API key") || errMsg.toLowerCase().includes("authentication")) {
+      if (AUTH_ERROR_RE.test(errMsg)) {
         throw new AuthenticationError(errMsg);
       }
       throw new ServerError(errMsg);
@@ -322,96 +443,67 @@ export class TODOforAIEdge {
     const run = (fn: () => Promise<void>) => {
       fn().catch(e => console.error(`[handler error]`, e));
     };
-    const send = this.sendResponse;
 
+    // Server messages that mutate edge state stay inline; everything else is a
+    // single lookup in the handler table.
     switch (msgType) {
       case SR.CONNECTED_EDGE:
         this.edgeId = payload.edgeId || "";
         this.userId = payload.userId || "";
         this.edgeConfig.id = this.edgeId;
+        this.serverConfig = {};
         console.log(`\x1b[32m\x1b[1m🔗 Connected edge=${this.edgeId} user=${this.userId}\x1b[0m`);
+        this.scheduleConfigSync();
         run(async () => {
           this.updateConfig({ installedTools: await scanCatalogTools() });
           await autoMountRcloneRemotes();
         });
-        break;
+        return;
 
       case S2E.EDGE_CONFIG_UPDATE:
         run(async () => this.handleEdgeConfigUpdate(payload));
-        break;
-
-      case S2E.PREVIEW_HTTP_REQUEST:
-        run(() => handlePreviewHttpRequest(payload, send));
-        break;
+        return;
 
       case S2E.SESSION_TOKEN:
         if (typeof payload.token === "string" && payload.token.startsWith("dst_")) {
           this.sessionToken = payload.token;
           if (this.debug) console.log(`[recv] session token (expires in ${payload.expiresIn}s)`);
         }
-        break;
-
-      case FE.EDGE_CD:
-        run(() => handleCd(payload, send, this.edgeConfig, (u) => this.updateConfig(u)));
-        break;
-
-      case FE.BLOCK_EXECUTE:
-        run(() => handleBlockExecute(payload, send, this.edgeId, this.maxTimeout));
-        break;
-
-      case FE.BLOCK_SAVE:
-        run(() => handleBlockSave(payload, send));
-        break;
-
-      case FE.BLOCK_KEYBOARD:
-        run(() => handleBlockKeyboard(payload));
-        break;
-
-      case FE.BLOCK_SIGNAL:
-        run(async () => handleBlockSignal(payload));
-        break;
-
-      case FE.TASK_ACTION_NEW:
-        run(() => handleTaskActionNew(payload, send));
-        break;
-
-      case AE.CTX_JULIA_REQUEST:
-        run(() => handleCtxJuliaRequest(payload, send));
-        break;
-
-      case AE.FILE_CHUNK_REQUEST:
-        run(() => handleFileChunkRequest(payload, send));
-        break;
-
-      case FE.FRONTEND_FILE_CHUNK_REQUEST:
-        run(() => handleFileChunkRequest(payload, send, EF.FRONTEND_FILE_CHUNK_RESULT));
-        break;
-
-      case FE.GET_FOLDERS:
-        run(() => handleGetFolders(payload, send));
-        break;
-
-      case FE.EDGE_CREATE_FOLDER:
-        run(() => handleCreateFolder(payload, send));
-        break;
-
-      case FE.EDGE_DELETE_PATH:
-        run(() => handleDeletePath(payload, send));
-        break;
+        return;
+    }
 
-      case FE.EDGE_WRITE_FILE:
-        run(() => handleWriteFile(payload, send, this.pendingBinaries));
-        break;
+    const handler = this.handlers.get(msgType);
+    if (handler) run(() => handler(payload));
+    else if (this.debug) console.log(`[warn] Unknown message type: ${msgType}`);
+  }
 
-      case AE.FUNCTION_CALL_REQUEST_AGENT:
-      case FE.FUNCTION_CALL_REQUEST_FRONT:
-        if (this.debug) console.log(`[edge] ← ${msgType} reqId=${payload.requestId} fn=${payload.functionName} cmd=${String(payload.args?.cmd || '').slice(0, 100)}`);
-        run(() => handleFunctionCall(payload, send, this));
-        break;
+  /** msgType → fire-and-forget handler, built once per edge. */
+  private buildHandlers(): Map<string, MessageHandler> {
+    const send = this.sendResponse;
+    const fileIo = createLimiter(MAX_CONCURRENT_FILE_IO);
+    const functionCall = (msgType: string): MessageHandler => (payload) => {
+      if (this.debug) console.log(`[edge] ← ${msgType} reqId=${payload.requestId} fn=${payload.functionName} cmd=${String(payload.args?.cmd || '').slice(0, 100)}`);
+      return handleFunctionCall(payload, send, this);
+    };
 
-      default:
-        if (this.debug) console.log(`[warn] Unknown message type: ${msgType}`);
-    }
+    return new Map<string, MessageHandler>([
+      [S2E.PREVIEW_HTTP_REQUEST, (p) => handlePreviewHttpRequest(p as any, send)],
+      [FE.EDGE_CD, (p) => handleCd(p, send, this.edgeConfig, (u) => this.updateConfig(u))],
+      [FE.BLOCK_EXECUTE, (p) => handleBlockExecute(p, send, this.edgeId, this.maxTimeout)],
+      [FE.BLOCK_SAVE, (p) => handleBlockSave(p, send)],
+      [FE.BLOCK_KEYBOARD, (p) => handleBlockKeyboard(p)],
+      [FE.BLOCK_SIGNAL, (p) => handleBlockSignal(p)],
+      [FE.TASK_ACTION_NEW, (p) => handleTaskActionNew(p, send)],
+      [AE.CTX_JULIA_REQUEST, (p) => handleCtxJuliaRequest(p, send)],
+      [AE.FILE_CHUNK_REQUEST, (p) => fileIo(() => handleFileChunkRequest(p, send))],
+      [FE.FRONTEND_FILE_CHUNK_REQUEST, (p) => fileIo(() => handleFileChunkRequest(p, send, EF.FRONTEND_FILE_CHUNK_RESULT))],
+      [FE.GET_FOLDERS, (p) => handleGetFolders(p, send)],
+      [FE.EDGE_CREATE_FOLDER, (p) => handleCreateFolder(p, send)],
+      [FE.EDGE_DELETE_PATH, (p) => handleDeletePath(p, send)],
+      [FE.EDGE_WRITE_FILE, (p) => fileIo(() => handleWriteFile(p, send, this.pendingBinaries))],
+      [AE.FUNCTION_CALL_REQUEST_AGENT, functionCall(AE.FUNCTION_CALL_REQUEST_AGENT)],
+      [FE.FUNCTION_CALL_REQUEST_FRONT, functionCall(FE.FUNCTION_CALL_REQUEST_FRONT)],
+    ]);
   }
 
   // ── Connection ──
@@ -463,12 +555,19 @@ export class TODOforAIEdge {
    *  to the reconnect loop; rejects only for non-recoverable server errors. */
   private connect(): Promise<number> {
     return new Promise((resolve, reject) => {
-      const url = `${this.wsUrl}?fingerprint=${encodeURIComponent(this.fingerprint)}`;
-      if (this.debug) console.log(`[info] Connecting to ${url}`);
+      if (this.debug) console.log(`[info] Connecting to ${this.connectUrl}`);
 
-      const ws = new WebSocket(url, [this.api.apiKey], {
+      const ws = new WebSocket(this.connectUrl, [this.api.apiKey], {
         maxPayload: 5 * 1024 * 1024,
+        // The bulk of the traffic is file bytes — raw binary frames or base64
+        // of mostly already-compressed media — where deflate burns CPU (and a
+        // zlib context per socket) for next to no gain.
+        perMessageDeflate: false,
+        // The server is ours and only emits JSON.stringify output, so skip
+        // ws's per-byte UTF-8 validation of every text frame.
+        skipUTF8Validation: true,
         rejectUnauthorized: false,
+        agent: this.wsAgent,
         // Without this, a hung handshake (common right after a network drop:
         // SYN sent, socket stuck half-open) never emits open/close/error, so
         // connect() blocks forever and the reconnect loop stalls. On timeout
@@ -500,8 +599,7 @@ export class TODOforAIEdge {
 
       ws.on("message", (data, isBinary) => {
         if (isBinary) {
-          const frame = data instanceof Buffer ? new Uint8Array(data) : new Uint8Array(data as ArrayBuffer);
-          this.storeBinaryFrame(frame);
+          this.storeBinaryFrame(Buffer.isBuffer(data) ? data : Buffer.from(data as ArrayBuffer));
           return;
         }
         this.handleMessage(data.toString()).catch(e => {
@@ -542,8 +640,10 @@ export class TODOforAIEdge {
     try { this.browserExtensionBridge.start(); } catch {}
     this.fingerprint = generateFingerprint();
     console.log(`\x1b[36m\x1b[1m👆 Fingerprint:\x1b[0m ${this.fingerprint}`);
+    this.connectUrl = `${this.wsUrl}?fingerprint=${encodeURIComponent(this.fingerprint)}`;
 
     let attempt = 0;
+    let consecutive1012 = 0;
 
     while (!this.stopping) {
       console.log(`[info] Connecting${attempt > 0 ? ` (retry ${attempt})` : ""}`);
@@ -566,17 +666,16 @@ export class TODOforAIEdge {
       if (this.connectedAt && Date.now() - this.connectedAt > 60_000) attempt = 0;
       attempt++;
 
-      // 1012 (Service Restart) is a planned zero-downtime deploy signal, not a
-      // failure: nginx has already switched to the new instance, so reconnect
-      // near-instantly instead of the backoff (shrinks the offline gap that
-      // otherwise drops the device from the agent's tool list mid-turn).
-      const delay = closeCode === 1012 ? 0.2 : Math.min(2 * 2 ** Math.min(attempt - 1, 4), 30); // 2,4,8,16,30,30…
-      console.log(`[info] Reconnecting in ${delay}s...`);
+      consecutive1012 = closeCode === 1012 ? consecutive1012 + 1 : 0;
+
+      const delay = reconnectDelay(attempt, consecutive1012);
+      console.log(`[info] Reconnecting in ${delay.toFixed(1)}s...`);
       await new Promise<void>(r => {
         this.wakeReconnect = r;
         this.reconnectTimer = setTimeout(r, delay * 1000);
       });
     }
+    this.closeConfigSync();
   }
 
   // ── Shutdown ──
@@ -584,11 +683,13 @@ export class TODOforAIEdge {
   stop() {
     this.stopping = true;
     clearTimeout(this.reconnectTimer);
+    this.closeConfigSync();
     this.wakeReconnect?.();   // unblock start()'s reconnect sleep
     this.stopHeartbeat();
     this.browserExtensionBridge.stop();
     this.frontendWs?.close();
     this.ws?.terminate();
+    this.wsAgent?.destroy();
   }
 
   // ── Frontend WS (for SDK use) ──
@@ -1,14 +1,18 @@
 import fs from "fs";
 import path from "path";
 import os from "os";
+import crypto from "crypto";
+import { exec, execSync, spawn } from "child_process";
+import { Readable } from "stream";
+import { pipeline } from "stream/promises";
 import { readFileContent } from "./files.js";
 import { saveDocxContent, saveXlsxContent } from "./docx-handler.js";
-import { resolveFilePath, getPlatformDefaultDirectory, getPathOrDefault } from "./path-utils.js";
+import { resolveFilePath, getPlatformDefaultDirectory, resolveUnderRoot } from "./path-utils.js";
 import { executeBlock, waitForCompletion, drainBlockOutput, clearBlockOutput, isBlockAlive, sendInput, rearmPauseWatch, getPid, findBlockIdByPid, consumeExitedOutput, getReturnCode, type SendFn } from "./shell.js";
 // `pendingToolApprovals` was imported here to short-circuit the response when
 // executeBlock entered AWAITING_APPROVAL. DEAD with the install-gating removal.
 import { msg } from "./constants.js";
-import { ensureTool, uninstallTool, buildEnvWithTools, scanCatalogTools } from "./tool-registry.js";
+import { ensureTool, uninstallTool, buildEnvWithTools, scanCatalogTools, isToolInstalledAsync } from "./tool-registry.js";
 import { getConnectionEnv } from "./connection-context.js";
 import { allowedPreviewPorts } from "./preview.js";
 import { serveStaticDir } from "./static-server.js";
@@ -16,22 +20,28 @@ import { TOOL_CATALOG } from "./tool-catalog.js";
 import { getGlobalEdgeInstance } from "./edge.js";
 import { discoverSkills } from "./skills.js";
 import { discoverAgentMd } from "./agent-md.js";
+import { getWorkspaceTree } from "./workspace-tree.js";
 import { truncateLines, resolveOutputPolicy, applyOutputPolicy, DEFAULT_OUTPUT_MODE } from "../../../packages/shared-fbe/src/outputLimits";
 
 // ── Registry ──
 
 type FnHandler = (args: Record<string, any>, client?: any) => Promise<any>;
-export const FUNCTION_REGISTRY = new Map<string, FnHandler>();
+const registry = new Map<string, FnHandler>();
+/** name → handler. Read-only outside this module: register() is the only writer. */
+export const FUNCTION_REGISTRY: ReadonlyMap<string, FnHandler> = registry;
 
 function register(name: string, fn: FnHandler) {
-  FUNCTION_REGISTRY.set(name, fn);
+  registry.set(name, fn);
 }
 
 // ── Functions ──
 
+// Every register() runs at module load, so by the first call the list is final.
+let functionNames: string[] | undefined;
+
 register("list_available_functions", async () => {
-  const names = [...FUNCTION_REGISTRY.keys()];
-  return { functions: names, count: names.length };
+  functionNames ??= [...FUNCTION_REGISTRY.keys()];
+  return { functions: functionNames, count: functionNames.length };
 });
 
 register("get_current_directory", async () => ({ current_directory: process.cwd() }));
@@ -41,19 +51,29 @@ register("get_environment_variable", async (args) => ({
   value: process.env[args.var_name] ?? null,
 }));
 
-register("get_system_info", async () => {
-  let system = os.platform();
+// OS name can't change under a running process — read it once.
+let systemName: string | undefined;
+
+function getSystemName(): string {
+  if (systemName !== undefined) return systemName;
+  let system: string = os.platform();
   if (system === "darwin") system = "macOS";
   else if (system === "linux") {
     try {
       const release = fs.readFileSync("/etc/os-release", "utf-8");
-      const m = release.match(/PRETTY_NAME="(.+?)"/);
-      if (m) system = m[1];
-      else system = "Linux";
+      // os-release allows double-, single- or un-quoted values; tolerate
+      // trailing whitespace and CRLF, and treat an empty value as missing.
+      const m = release.match(/^PRETTY_NAME=(?:"([^"]*)"|'([^']*)'|([^\s"']\S*(?: \S+)*))\s*$/m);
+      system = (m && (m[1] ?? m[2] ?? m[3])) || "Linux";
     } catch { system = "Linux"; }
   } else if (system === "win32") {
     system = `Windows ${os.release()}`;
   }
+  return systemName = system;
+}
+
+register("get_system_info", async () => {
+  const system = getSystemName();
   const shell = process.env.SHELL ? path.basename(process.env.SHELL) : "unknown";
   const mount_path = path.join(os.homedir(), ".todoforai", "mnt", "todoforai");
   return { system, shell, mount_path };
@@ -82,8 +102,10 @@ register("install_tool", async (args) => {
   if (!name || !(name in TOOL_CATALOG)) {
     return { success: false, error: `Unknown tool: ${name}` };
   }
-  const scan = await scanCatalogTools();
-  if (scan[name]?.installed) {
+  // One tool's installed check, not a full catalog scan (which also runs every
+  // installed tool's version/auth-status command) — syncInstalledTools below
+  // does the one full scan this call needs.
+  if (await isToolInstalledAsync(name)) {
     return { success: true, alreadyInstalled: true, tool: name };
   }
   const installed = await ensureTool(name);
@@ -115,102 +137,7 @@ register("uninstall_tool", async (args) => {
 
 register("get_workspace_tree", async (args) => {
   const { path: p, max_depth = 2 } = args;
-  const root = path.resolve(p.replace(/^~/, process.env.HOME || "~"));
-  if (!fs.existsSync(root) || !fs.statSync(root).isDirectory()) {
-    return { tree: "", is_git: false };
-  }
-
-  const isGit = fs.existsSync(path.join(root, ".git"));
-
-  // Try external tree command first (Unix-like systems)
-  if (process.platform !== "win32") {
-    try {
-      const { execSync } = await import("child_process");
-      // Check if tree is available
-      execSync(process.platform === "win32" ? "where tree" : "which tree", { encoding: "utf-8", stdio: "pipe" });
-      const cmd = ["tree", "-L", String(max_depth), "--dirsfirst"];
-      if (isGit) cmd.push("--gitignore", "-I", ".git");
-      const result = execSync(cmd.join(" "), {
-        cwd: root, encoding: "utf-8", timeout: 5000,
-        maxBuffer: 1024 * 1024, stdio: ["pipe", "pipe", "pipe"],
-      }).trim();
-      if (result) return { tree: result, is_git: isGit };
-    } catch { /* fall through to JS implementation */ }
-  }
-
-  // Pure JS fallback with gitignore support via `ignore` package
-  const ignore = (await import("ignore")).default;
-  const ig = ignore();
-
-  if (isGit) {
-    // Collect all .gitignore patterns with directory-relative prefixes
-    function scanGitignores(dir: string) {
-      const giPath = path.join(dir, ".gitignore");
-      if (fs.existsSync(giPath)) {
-        try {
-          const relDir = path.relative(root, dir).replace(/\\/g, "/");
-          const prefix = relDir === "" || relDir === "." ? "" : relDir + "/";
-          for (let line of fs.readFileSync(giPath, "utf-8").split("\n")) {
-            line = line.trim();
-            if (!line || line.startsWith("#")) continue;
-            if (prefix) {
-              ig.add(line.startsWith("!") ? "!" + prefix + line.slice(1) : prefix + line);
-            } else {
-              ig.add(line);
-            }
-          }
-        } catch {}
-      }
-      try {
-        for (const e of fs.readdirSync(dir, { withFileTypes: true })) {
-          if (e.isDirectory() && e.name !== ".git") scanGitignores(path.join(dir, e.name));
-        }
-      } catch {}
-    }
-    scanGitignores(root);
-  }
-
-  const lines: string[] = [path.basename(root) + "/"];
-
-  function walk(dirPath: string, prefix: string, depth: number) {
-    if (depth > max_depth) return;
-    let entries: fs.Dirent[];
-    try {
-      entries = fs.readdirSync(dirPath, { withFileTypes: true });
-    } catch { return; }
-
-    const visible = entries
-      .filter(e => {
-        if (e.name === ".git") return false;
-        if (isGit) {
-          let rel = path.relative(root, path.join(dirPath, e.name)).replace(/\\/g, "/");
-          if (e.isDirectory()) rel += "/";
-          if (ig.ignores(rel)) return false;
-        }
-        return true;
-      })
-      .sort((a, b) => {
-        const aDir = a.isDirectory() ? 1 : 0;
-        const bDir = b.isDirectory() ? 1 : 0;
-        if (aDir !== bDir) return aDir - bDir;
-        return a.name.toLowerCase().localeCompare(b.name.toLowerCase());
-      });
-
-    for (let i = 0; i < visible.length; i++) {
-      const entry = visible[i];
-      const isLast = i === visible.length - 1;
-      const connector = isLast ? "└── " : "├── ";
-      const suffix = entry.isDirectory() ? "/" : "";
-      lines.push(`${prefix}${connector}${entry.name}${suffix}`);
-      if (entry.isDirectory()) {
-        const extension = isLast ? "    " : "│   ";
-        walk(path.join(dirPath, entry.name), prefix + extension, depth + 1);
-      }
-    }
-  }
-
-  walk(root, "", 1);
-  return { tree: lines.join("\n"), is_git: isGit };
+  return await getWorkspaceTree(p, max_depth);
 });
 
 register("get_skills", async (args) => {
@@ -234,9 +161,7 @@ register("get_os_aware_default_path", async () => {
 register("create_directory", async (args) => {
   const { name } = args;
   if (!name?.trim()) throw new Error("Folder name cannot be empty");
-  const baseDir = path.resolve(getPathOrDefault(args.path).replace(/^~/, process.env.HOME || "~"));
-  let target = path.resolve(name.replace(/^~/, process.env.HOME || "~"));
-  if (!path.isAbsolute(name)) target = path.join(baseDir, name.trim());
+  const target = resolveUnderRoot(name.trim(), args.path);
   const existed = fs.existsSync(target);
   fs.mkdirSync(target, { recursive: true });
   let full = target;
@@ -245,8 +170,8 @@ register("create_directory", async (args) => {
 });
 
 // Backward-compat aliases
-FUNCTION_REGISTRY.set("getOSAwareDefaultPath", FUNCTION_REGISTRY.get("get_os_aware_default_path")!);
-FUNCTION_REGISTRY.set("createDirectory", FUNCTION_REGISTRY.get("create_directory")!);
+register("getOSAwareDefaultPath", registry.get("get_os_aware_default_path")!);
+register("createDirectory", registry.get("create_directory")!);
 
 // Strip trailing `| tail -N` so the command streams fully,
 // then apply the line filter to the collected output before returning.
@@ -289,7 +214,6 @@ register("execute_shell_command", async (args, client) => {
 
   if (!canStream) {
     // Simple fallback (no session support without streaming context)
-    const { exec } = await import("child_process");
     const result = await new Promise<string>((resolve) => {
       exec(cmd, { cwd: cwd || os.tmpdir(), encoding: "utf-8", timeout: timeout * 1000, maxBuffer: 10 * 1024 * 1024, env: { ...buildEnvWithTools(), ...getConnectionEnv(), TODOFORAI_TODO_ID: todoId, TODOFORAI_MESSAGE_ID: messageId, TODOFORAI_BLOCK_ID: blockId, TODOFORAI_AGENT_SETTINGS_ID: agentSettingsId, AGENT_BROWSER_SESSION: todoId } }, (_err, stdout, stderr) => {
         resolve((stdout || "") + (stderr || ""));
@@ -438,25 +362,26 @@ register("create_file", async (args) => {
 
   const dir = path.dirname(fullPath);
   if (dir) fs.mkdirSync(dir, { recursive: true });
-  fs.writeFileSync(fullPath, content, "utf-8");
-  return { path: fullPath, bytes: Buffer.byteLength(content, "utf-8") };
+  const data = Buffer.from(content, "utf-8");
+  fs.writeFileSync(fullPath, data);
+  return { path: fullPath, bytes: data.length };
 });
 
 register("read_file_base64", async (args) => {
   const { path: p, rootPath = "", fallbackRootPaths = [] } = args;
   const fullPath = resolveFilePath(p, rootPath, fallbackRootPaths);
-  if (!fs.existsSync(fullPath)) throw new Error(`File not found: ${fullPath}`);
-  const stat = fs.statSync(fullPath);
+  const stat = fs.statSync(fullPath, { throwIfNoEntry: false });
+  if (!stat) throw new Error(`File not found: ${fullPath}`);
   if (stat.size > 50_000_000) throw new Error(`File too large: ${stat.size.toLocaleString()} bytes (max 50MB)`);
-  const data = fs.readFileSync(fullPath);
+  // Async read: a 50MB file must not stall the WS heartbeat and other handlers.
+  const data = await fs.promises.readFile(fullPath);
   return { path: fullPath, base64: data.toString("base64"), bytes: data.length };
 });
 
 register("search_files", async (args) => {
   const { pattern, path: p = ".", cwd = (args as any).root_path ?? "", head = 100, max_count = 5, glob: globPattern = "", ignore_case = true, output: outputMode = DEFAULT_OUTPUT_MODE } = args;
-  const { execSync: execWhich } = await import("child_process");
   const whichCmd = process.platform === "win32" ? "where" : "which";
-  const which = (bin: string) => { try { return execWhich(`${whichCmd} ${bin}`, { encoding: "utf-8" }).trim().split("\n")[0].trim(); } catch { return null; } };
+  const which = (bin: string) => { try { return execSync(`${whichCmd} ${bin}`, { encoding: "utf-8" }).trim().split("\n")[0].trim(); } catch { return null; } };
   let rgPath = which("rg");
   if (!rgPath) {
     await ensureTool("rg");
@@ -489,9 +414,8 @@ register("search_files", async (args) => {
     cmd.push(pattern, searchPath);
   }
 
-  const { spawn: spawnChild } = await import("child_process");
   const { stdout, stderr, code } = await new Promise<{ stdout: string; stderr: string; code: number }>((resolve) => {
-    const child = spawnChild(cmd[0], cmd.slice(1));
+    const child = spawn(cmd[0], cmd.slice(1));
     let out = "", err = "";
     child.stdout?.on("data", (d: Buffer) => { out += d.toString(); });
     child.stderr?.on("data", (d: Buffer) => { err += d.toString(); });
@@ -503,24 +427,30 @@ register("search_files", async (args) => {
     // Make paths relative if close (cosmetic; truncation happens after).
     if ((cwd || searchPath) && output) {
       // Use dir form of searchPath as base (so file paths relativize cleanly)
-      const searchBase = searchPath && fs.existsSync(searchPath) && fs.statSync(searchPath).isDirectory() ? searchPath : path.dirname(searchPath);
+      const searchBase = fs.statSync(searchPath, { throwIfNoEntry: false })?.isDirectory() ? searchPath : path.dirname(searchPath);
       const bases = Array.from(new Set([cwd, searchBase].filter(Boolean))) as string[];
-      const lines = output.split("\n").map(line => {
-        if (line.includes(":")) {
-          const colonIdx = line.indexOf(":");
-          let filePart = line.slice(0, colonIdx);
-          const rest = line.slice(colonIdx);
-          // Pick the shortest candidate among absolute and all bases (within 2 up-levels)
-          try {
-            const candidates = [filePart, ...bases.map(b => path.relative(b, filePart))]
-              .filter(p => (p.match(/\.\.\//g) || []).length <= 2);
-            filePart = candidates.reduce((a, b) => a.length <= b.length ? a : b, filePart);
-          } catch {
-            // Keep absolute on error
-          }
-          return filePart + rest;
+      // Matches arrive grouped by file (up to max_count lines each), so each
+      // distinct path is relativized once.
+      const shortened = new Map<string, string>();
+      const shorten = (filePart: string) => {
+        let best = shortened.get(filePart);
+        if (best !== undefined) return best;
+        best = filePart;
+        // Pick the shortest candidate among absolute and all bases (within 2 up-levels)
+        try {
+          const candidates = [filePart, ...bases.map(b => path.relative(b, filePart))]
+            .filter(p => (p.match(/\.\.\//g) || []).length <= 2);
+          best = candidates.reduce((a, b) => a.length <= b.length ? a : b, filePart);
+        } catch {
+          // Keep absolute on error
         }
-        return line;
+        shortened.set(filePart, best);
+        return best;
+      };
+      const lines = output.split("\n").map(line => {
+        const colonIdx = line.indexOf(":");
+        if (colonIdx === -1) return line;
+        return shorten(line.slice(0, colonIdx)) + line.slice(colonIdx);
       });
       output = lines.join("\n");
     }
@@ -535,65 +465,50 @@ register("download_attachment", async (args, client) => {
   const { attachmentId, path: p = "", rootPath = "" } = args;
   if (!p) throw new Error("No file path provided");
 
-  const apiUrl = client.apiUrl.replace(/\/+$/, "");
-  const res = await fetch(`${apiUrl}/api/v1/files/${attachmentId}`, {
-    headers: { "x-api-key": client.apiKey },
-  });
-  if (!res.ok) throw new Error(`Backend responded with ${res.status}`);
+  const res = await client.api.downloadFile(attachmentId);
 
-  const base = getPathOrDefault(rootPath);
-  let target = p.replace(/^~/, process.env.HOME || "~");
-  if (!path.isAbsolute(target)) target = path.join(base, target);
-  target = path.resolve(target);
+  const target = resolveUnderRoot(p, rootPath);
   fs.mkdirSync(path.dirname(target), { recursive: true });
 
+  // Stream to a sibling temp file, then rename over the target: attachments can
+  // be far larger than we'd want to hold in memory, and a failed transfer must
+  // neither leave a truncated file nor clobber one the user already had.
+  const part = `${target}.part-${crypto.randomBytes(6).toString("hex")}`;
   try {
-    const data = Buffer.from(await res.arrayBuffer());
-    fs.writeFileSync(target, data);
-    return { path: target, bytes: data.length };
+    if (res.body) await pipeline(Readable.fromWeb(res.body as any), fs.createWriteStream(part));
+    else fs.writeFileSync(part, "");
+    const bytes = fs.statSync(part).size;
+    fs.renameSync(part, target);
+    return { path: target, bytes };
   } catch (e: any) {
+    fs.rmSync(part, { force: true });
     throw new Error(`Download failed: ${e.message}`);
   }
 });
 
 register("download_chat", async (args, client) => {
   if (!client) throw new Error("Client instance required");
-  try {
-    const res = await fetch(`${client.apiUrl.replace(/\/+$/, "")}/api/v1/todos/${args.todoId}`, {
-      headers: { "x-api-key": client.apiKey },
-    });
-    if (!res.ok) throw new Error(`Backend responded with ${res.status}: ${await res.text()}`);
-    return { todo: await res.json() };
-  } catch (e: any) {
-    if (e instanceof Error) throw e;
-    throw new Error(`Download chat failed: ${e.message}`);
-  }
+  return { todo: await client.api.getTodo(args.todoId) };
 });
 
 register("register_attachment", async (args, client) => {
   if (!client) throw new Error("Client instance required");
   const { filePath, userId = "test-user", isPublic = false, agentSettingsId = "", todoId = "", rootPath = "" } = args;
 
-  const base = getPathOrDefault(rootPath);
-  let target = filePath.replace(/^~/, process.env.HOME || "~");
-  if (!path.isAbsolute(target)) target = path.join(base, target);
-  target = path.resolve(target);
+  const target = resolveUnderRoot(filePath, rootPath);
   if (!fs.existsSync(target)) throw new Error(`File not found: ${target}`);
 
+  // File-backed Blob: fetch streams the multipart body from disk instead of us
+  // reading the whole file into memory first.
+  const file = typeof Bun !== "undefined" ? Bun.file(target) : await fs.openAsBlob(target);
   const form = new FormData();
-  form.append("file", new Blob([fs.readFileSync(target)]), path.basename(target));
+  form.append("file", file, path.basename(target));
   if (userId) form.append("userId", userId);
   if (agentSettingsId) form.append("agentSettingsId", agentSettingsId);
   if (todoId) form.append("todoId", todoId);
   form.append("isPublic", isPublic ? "true" : "false");
 
-  const res = await fetch(`${client.apiUrl.replace(/\/+$/, "")}/api/v1/resources/register`, {
-    method: "POST",
-    headers: { "x-api-key": client.apiKey },
-    body: form,
-  });
-  if (!res.ok) throw new Error(`Backend responded with ${res.status}: ${await res.text()}`);
-  const payload = await res.json().catch(() => ({}));
+  const payload = await client.api.registerResource(form);
   return { attachmentId: payload.attachmentId, response: payload };
 });
 
@@ -2,7 +2,7 @@ import fs from "fs";
 import { mkdir, rm, writeFile } from "fs/promises";
 import path from "path";
 import { msg, EA, EF, type WsMessage } from "./constants.js";
-import { resolveFilePath, getPathOrDefault, WorkspacePathNotFoundError } from "./path-utils.js";
+import { resolveFilePath, getPathOrDefault, WorkspacePathNotFoundError, FORBIDDEN_PATHS } from "./path-utils.js";
 import { readFileContent } from "./files.js";
 import { saveDocxContent, saveXlsxContent } from "./docx-handler.js";
 import { executeBlock, sendInput, interruptBlock, detachBlock, type SendFn } from "./shell.js";
@@ -157,8 +157,6 @@ export async function handleWriteFile(payload: Record<string, any>, send: SendFn
 
 // ── CD ──
 
-const FORBIDDEN_PATHS = new Set(["/", "/tmp", "C:\\", "C:/"]);
-
 // Read the current git branch for a directory by walking up to the .git dir and
 // parsing HEAD. Returns undefined when the path isn't inside a git repo.
 function getGitBranch(dir: string): string | undefined {
@@ -2,7 +2,7 @@ import { describe, test, expect } from "bun:test";
 import path from "path";
 import fs from "fs";
 import os from "os";
-import { resolveFilePath, WorkspacePathNotFoundError } from "./path-utils.js";
+import { resolveFilePath, resolveUnderRoot, WorkspacePathNotFoundError } from "./path-utils.js";
 
 describe("resolveFilePath", () => {
   test("resolves via fallback root paths", () => {
@@ -44,3 +44,19 @@ describe("resolveFilePath", () => {
     );
   });
 });
+
+describe("resolveUnderRoot", () => {
+  test("joins relative paths onto the root", () => {
+    expect(resolveUnderRoot("a/../b.txt", "/srv/ws")).toBe(path.resolve("/srv/ws/b.txt"));
+  });
+
+  test("absolute paths ignore the root", () => {
+    expect(resolveUnderRoot("/etc/hosts", "/srv/ws")).toBe("/etc/hosts");
+  });
+
+  test("expands ~ in both path and root", () => {
+    const home = process.env.HOME!;
+    expect(resolveUnderRoot("~/x", "/srv/ws")).toBe(path.join(home, "x"));
+    expect(resolveUnderRoot("x", "~/ws")).toBe(path.join(home, "ws", "x"));
+  });
+});
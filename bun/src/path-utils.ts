@@ -2,6 +2,9 @@ import path from "path";
 import fs from "fs";
 import { fileURLToPath } from "url";
 
+/** Roots that may never become workspace paths (compared without trailing slash). */
+export const FORBIDDEN_PATHS: ReadonlySet<string> = new Set(["/", "/tmp", "C:\\", "C:/"]);
+
 export class WorkspacePathNotFoundError extends Error {
   missingRoots: string[];
   constructor(filePath: string, missingRoots: string[]) {
@@ -35,13 +38,21 @@ function getParentDirectoryIfNeeded(filePath: string, rootPath: string | undefin
 }
 
 function findFileInWorkspaces(filePath: string, workspacePaths: string[], primaryPath?: string): string | null {
+  // primaryPath is normally also in workspacePaths, and an absolute filePath
+  // resolves to itself under every root — stat each distinct candidate once.
+  const tried = new Set<string>();
+  const exists = (candidate: string) => {
+    if (tried.has(candidate)) return false;
+    tried.add(candidate);
+    return fs.existsSync(candidate);
+  };
   if (primaryPath) {
     const candidate = path.isAbsolute(filePath) ? filePath : path.resolve(expandUser(primaryPath), filePath);
-    if (fs.existsSync(candidate)) return candidate;
+    if (exists(candidate)) return candidate;
   }
   for (const wp of workspacePaths) {
     const candidate = path.resolve(expandUser(wp), filePath);
-    if (fs.existsSync(candidate)) return candidate;
+    if (exists(candidate)) return candidate;
   }
   return null;
 }
@@ -79,15 +90,28 @@ export function resolveFilePath(filePath: string, rootPath?: string, fallbackRoo
   return filePath;
 }
 
+// Resolved home directory (null: none usable), looked up once per process.
+let defaultHome: string | null | undefined;
+
 export function getPlatformDefaultDirectory(): string {
-  try {
-    const home = process.env.HOME || process.env.USERPROFILE;
-    if (home && fs.existsSync(home)) return path.resolve(home);
-  } catch {}
-  return process.cwd();
+  if (defaultHome === undefined) {
+    defaultHome = null;
+    try {
+      const home = process.env.HOME || process.env.USERPROFILE;
+      if (home && fs.existsSync(home)) defaultHome = path.resolve(home);
+    } catch {}
+  }
+  return defaultHome ?? process.cwd();
+}
+
+/** Expand `~` and resolve `p` against `root` (platform default dir when unset). */
+export function resolveUnderRoot(p: string, root?: string): string {
+  const target = expandUser(p);
+  if (path.isAbsolute(target)) return path.resolve(target);
+  return path.resolve(expandUser(getPathOrDefault(root)), target);
 }
 
 export function getPathOrDefault(p?: string): string {
-  if (!p || p === "." || p === "") return getPlatformDefaultDirectory();
+  if (!p || p === ".") return getPlatformDefaultDirectory();
   return p;
 }
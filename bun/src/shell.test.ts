@@ -34,6 +34,27 @@ describe.if(linux)("executeBlock detach + resume (real process)", () => {
   }, 40000);
 });
 
+describe.if(linux)("waitForCompletion across resumes", () => {
+  test("an earlier wait's timer doesn't unhook the next waiter", async () => {
+    const blockId = "test-rewait";
+    await executeBlock(blockId, "read x; sleep 5; echo done", noop,
+      "todo", "msg", 30, "", false, "internal", undefined, "", true);
+    // First wait returns early on the pause, leaving its 3s timeout behind.
+    await waitForCompletion(blockId, 3000);
+    expect(isBlockAlive(blockId)).toBe(true);
+
+    // Second wait spans that timer: it must still return on exit (~5s), not
+    // at its own 20s timeout.
+    expect(await sendInput(blockId, "go")).toBe(true);
+    const started = Date.now();
+    await waitForCompletion(blockId, 20000);
+    expect(Date.now() - started).toBeLessThan(10000);
+    expect(isBlockAlive(blockId)).toBe(false);
+    expect(getBlockOutput(blockId)).toContain("done");
+    clearBlockOutput(blockId);
+  }, 40000);
+});
+
 describe.if(linux)("execute_shell_command resume-by-pid", () => {
   const fn = FUNCTION_REGISTRY.get("execute_shell_command")!;
   const client = { maxTimeout: 0, sendResponse: noop } as any;
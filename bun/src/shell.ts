@@ -485,16 +485,19 @@ export function interruptBlock(blockId: string) {
 
 // ── Helpers for execute_shell_command function ──
 
+/** Resolves on exit/pause or after timeoutMs. Completion cancels the timeout
+ *  timer, and a timer only removes its own resolver — a leftover timer from an
+ *  earlier wait on the same block (resume by pid) must not unhook the current
+ *  waiter and leave it stuck until its own timeout. */
 export function waitForCompletion(blockId: string, timeoutMs: number): Promise<void> {
   return new Promise((resolve) => {
     if (!processes.has(blockId)) return resolve();
-    completionResolvers.set(blockId, resolve);
-    setTimeout(() => {
-      if (completionResolvers.has(blockId)) {
-        completionResolvers.delete(blockId);
-        resolve();
-      }
+    const timer = setTimeout(() => {
+      if (completionResolvers.get(blockId) === done) completionResolvers.delete(blockId);
+      resolve();
     }, timeoutMs);
+    const done = () => { clearTimeout(timer); resolve(); };
+    completionResolvers.set(blockId, done);
   });
 }
 
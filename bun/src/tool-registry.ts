@@ -83,8 +83,8 @@ export function isToolInstalled(name: string): boolean {
   return whichWithTools(binFileName(name)) !== null;
 }
 
-/** Async isToolInstalled — non-blocking pip check for the reconnect scan path. */
-async function isToolInstalledAsync(name: string): Promise<boolean> {
+/** Async isToolInstalled — non-blocking pip check for the reconnect scan and install_tool. */
+export async function isToolInstalledAsync(name: string): Promise<boolean> {
   const entry = TOOL_CATALOG[name];
   if (!entry) return false;
 
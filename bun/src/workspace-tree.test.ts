@@ -2,7 +2,9 @@ import { describe, test, expect } from "bun:test";
 import path from "path";
 import fs from "fs";
 import os from "os";
+import { spawnSync } from "child_process";
 import { FUNCTION_REGISTRY } from "./functions.js";
+import { gitIgnored, renderWorkspaceTree } from "./workspace-tree.js";
 
 const getWorkspaceTree = FUNCTION_REGISTRY.get("get_workspace_tree")!;
 
@@ -161,3 +163,66 @@ describe("get_workspace_tree", () => {
     fs.rmSync(tmp, { recursive: true });
   });
 });
+
+// The tests above fake .git with an empty HEAD, so git refuses them and only
+// the `ignore` fallback runs. These use a real repo to cover git's matcher.
+const hasGit = spawnSync("git", ["--version"]).status === 0;
+
+function makeGitRepo(structure: Record<string, any>): string {
+  const tmp = makeTmpDir();
+  spawnSync("git", ["init", "-q", tmp]);
+  makeStructure(tmp, structure);
+  return tmp;
+}
+
+describe.skipIf(!hasGit)("gitIgnored (real repo)", () => {
+  test("nested, negated and directory-only rules", () => {
+    const tmp = makeGitRepo({
+      ".gitignore": "build/\n*.log\n!keep.log\n",
+      build: { "out.js": null },
+      sub: { build: {} },
+      src: {
+        ".gitignore": "*.tmp\n!y.tmp\n",
+        build: null,
+        "x.tmp": null,
+        "y.tmp": null,
+      },
+      "a.log": null,
+      "keep.log": null,
+    });
+    const rels = ["build", "sub/build", "src/build", "src/x.tmp", "src/y.tmp", "a.log", "keep.log", "src"];
+    expect(gitIgnored(tmp, rels)).toEqual(new Set(["build", "sub/build", "src/x.tmp", "a.log"]));
+    fs.rmSync(tmp, { recursive: true });
+  });
+
+  test("null outside a repo, so the caller falls back", () => {
+    const tmp = makeTmpDir();
+    makeStructure(tmp, { ".git": { HEAD: null }, "a.log": null });
+    expect(gitIgnored(tmp, ["a.log"])).toBeNull();
+    fs.rmSync(tmp, { recursive: true });
+  });
+
+  test("JS tree uses git's matcher in a real repo", () => {
+    // Called directly: get_workspace_tree would prefer the `tree` command.
+    const tmp = makeGitRepo({
+      ".gitignore": "dist/\n*.log\n!keep.log\n",
+      dist: { "bundle.js": null },
+      src: { ".gitignore": "*.tmp\n", "main.ts": null, "cache.tmp": null, dist: null },
+      "debug.log": null,
+      "keep.log": null,
+      "secret.txt": null,
+    });
+    // Only git reads info/exclude — proves the `ignore` fallback didn't run.
+    fs.mkdirSync(path.join(tmp, ".git", "info"), { recursive: true });
+    fs.appendFileSync(path.join(tmp, ".git", "info", "exclude"), "secret.txt\n");
+    const tree = renderWorkspaceTree(tmp, 2, true);
+    expect(tree).not.toContain("secret.txt");
+    expect(tree).not.toContain("bundle.js");
+    expect(tree).not.toContain("debug.log");
+    expect(tree).not.toContain("cache.tmp");
+    expect(tree).toContain("keep.log");
+    expect(tree).toContain("main.ts");
+    expect(tree).toMatch(/── dist$/m); // src/dist is a file, not matched by dist/
+    fs.rmSync(tmp, { recursive: true });
+  });
+});
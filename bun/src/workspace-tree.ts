@@ -0,0 +1,154 @@
+/** get_workspace_tree: `tree -L N --gitignore` with a pure-JS fallback. */
+
+import fs from "fs";
+import path from "path";
+import { execSync, spawnSync } from "child_process";
+import ignore from "ignore";
+
+// ── .gitignore rules ──
+
+/** A .gitignore's rules, re-rooted at the repo root by prefixing `prefix`. */
+function gitignoreRules(giPath: string, prefix: string): string[] {
+  const rules: string[] = [];
+  for (let line of fs.readFileSync(giPath, "utf-8").split("\n")) {
+    line = line.trim();
+    if (!line || line.startsWith("#")) continue;
+    if (prefix) {
+      rules.push(line.startsWith("!") ? "!" + prefix + line.slice(1) : prefix + line);
+    } else {
+      rules.push(line);
+    }
+  }
+  return rules;
+}
+
+// ── Native matcher ──
+
+/** Subset of `rels` that git itself considers ignored (nested .gitignore,
+ *  .git/info/exclude and core.excludesFile included). `--no-index` also reports
+ *  tracked-but-ignored paths, matching `tree --gitignore`. Null when git can't
+ *  answer (not a real repo, git missing) — the caller falls back to JS. */
+export function gitIgnored(root: string, rels: string[]): Set<string> | null {
+  if (rels.length === 0) return new Set();
+  const r = spawnSync("git", ["-C", root, "check-ignore", "--no-index", "--stdin", "-z"], {
+    input: rels.join("\0") + "\0", encoding: "utf-8", timeout: 5000,
+    maxBuffer: 16 * 1024 * 1024, stdio: ["pipe", "pipe", "pipe"],
+  });
+  // exit 0 = some ignored, 1 = none ignored, 128 = fatal
+  if (r.error || (r.status !== 0 && r.status !== 1)) return null;
+  return new Set(r.stdout.split("\0").filter(Boolean));
+}
+
+// ── Tree ──
+
+type TreeNode = { name: string; rel: string; isDir: boolean; children: TreeNode[] };
+
+/** Walk breadth-first down to maxDepth. `keep` filters one whole depth level at
+ *  a time (so the native matcher costs one call per level, not per entry), and
+ *  ignored directories are never descended into. Null if `keep` gives up. */
+function buildTree(
+  root: string,
+  maxDepth: number,
+  keep: (level: TreeNode[]) => Set<TreeNode> | null,
+): TreeNode[] | null {
+  const top: TreeNode[] = [];
+  let frontier = [{ abs: root, children: top }];
+  for (let depth = 1; depth <= maxDepth && frontier.length; depth++) {
+    const level: { node: TreeNode; abs: string; siblings: TreeNode[] }[] = [];
+    for (const dir of frontier) {
+      let entries: fs.Dirent[];
+      try {
+        entries = fs.readdirSync(dir.abs, { withFileTypes: true });
+      } catch { continue; }
+      for (const e of entries) {
+        if (e.name === ".git") continue;
+        const abs = path.join(dir.abs, e.name);
+        const rel = path.relative(root, abs).replace(/\\/g, "/");
+        level.push({ node: { name: e.name, rel, isDir: e.isDirectory(), children: [] }, abs, siblings: dir.children });
+      }
+    }
+    const visible = keep(level.map(l => l.node));
+    if (!visible) return null;
+    frontier = [];
+    for (const { node, abs, siblings } of level) {
+      if (!visible.has(node)) continue;
+      siblings.push(node);
+      if (node.isDir) frontier.push({ abs, children: node.children });
+    }
+  }
+  return top;
+}
+
+function renderTree(nodes: TreeNode[], prefix: string, lines: string[]) {
+  nodes.sort((a, b) => {
+    const aDir = a.isDir ? 1 : 0;
+    const bDir = b.isDir ? 1 : 0;
+    if (aDir !== bDir) return aDir - bDir;
+    return a.name.toLowerCase().localeCompare(b.name.toLowerCase());
+  });
+  for (let i = 0; i < nodes.length; i++) {
+    const node = nodes[i];
+    const isLast = i === nodes.length - 1;
+    const connector = isLast ? "└── " : "├── ";
+    lines.push(`${prefix}${connector}${node.name}${node.isDir ? "/" : ""}`);
+    if (node.isDir) renderTree(node.children, prefix + (isLast ? "    " : "│   "), lines);
+  }
+}
+
+export async function getWorkspaceTree(p: string, maxDepth = 2): Promise<{ tree: string; is_git: boolean }> {
+  const root = path.resolve(p.replace(/^~/, process.env.HOME || "~"));
+  if (!fs.statSync(root, { throwIfNoEntry: false })?.isDirectory()) {
+    return { tree: "", is_git: false };
+  }
+
+  const isGit = fs.existsSync(path.join(root, ".git"));
+
+  // Try external tree command first (Unix-like systems)
+  if (process.platform !== "win32") {
+    try {
+      // Check if tree is available
+      execSync("which tree", { encoding: "utf-8", stdio: "pipe" });
+      const cmd = ["tree", "-L", String(maxDepth), "--dirsfirst"];
+      if (isGit) cmd.push("--gitignore", "-I", ".git");
+      const result = execSync(cmd.join(" "), {
+        cwd: root, encoding: "utf-8", timeout: 5000,
+        maxBuffer: 1024 * 1024, stdio: ["pipe", "pipe", "pipe"],
+      }).trim();
+      if (result) return { tree: result, is_git: isGit };
+    } catch { /* fall through to JS implementation */ }
+  }
+
+  return { tree: renderWorkspaceTree(root, maxDepth, isGit), is_git: isGit };
+}
+
+/** The JS tree for `root`, as used when the `tree` command is missing or fails.
+ *  Git's own matcher when this is a real repo; otherwise the `ignore` package. */
+export function renderWorkspaceTree(root: string, maxDepth: number, isGit: boolean): string {
+  let nodes = isGit
+    ? buildTree(root, maxDepth, (level) => {
+        const ignored = gitIgnored(root, level.map(n => n.rel));
+        return ignored && new Set(level.filter(n => !ignored.has(n.rel)));
+      })
+    : null;
+  if (!nodes) {
+    const ig = ignore();
+    nodes = buildTree(root, maxDepth, (level) => {
+      if (!isGit) return new Set(level);
+      // Rules load as the walk reaches them: a level lists its parents'
+      // .gitignore files, which govern that same level (ancestors' are already
+      // in). Nothing past maxDepth or inside an ignored directory is read.
+      for (const n of level) {
+        if (n.name !== ".gitignore" || n.isDir) continue;
+        const relDir = path.posix.dirname(n.rel);
+        try {
+          ig.add(gitignoreRules(path.join(root, n.rel), relDir === "." ? "" : relDir + "/"));
+        } catch {}
+      }
+      return new Set(level.filter(n => !ig.ignores(n.isDir ? n.rel + "/" : n.rel)));
+    })!;
+  }
+
+  const lines: string[] = [path.basename(root) + "/"];
+  renderTree(nodes, "", lines);
+  return lines.join("\n");
+}